@@ -8,5 +8,6 @@ wp.save_as_json('output/test.json')
 
 wp.open('multipage.will')
 wp.save_as_svg('output/mp.svg', use_polyline=False)
+wp.save_as_svg('output/mp_curves.svg', use_curves=True)
 wp.save_as_inkml('output/mp.inkml')
 wp.save_as_json('output/mp.json')
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: wacompath.proto
+# Protobuf Python Version: 4.25.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0fwacompath.proto\x12\x0eWacomInkFormat\"\xaf\x01\n\x04Path\x12\x19\n\x0estartParameter\x18\x01 \x01(\x02:\x01\x30\x12\x17\n\x0c\x65ndParameter\x18\x02 \x01(\x02:\x01\x31\x12\x1b\n\x10\x64\x65\x63imalPrecision\x18\x03 \x01(\r:\x01\x32\x12\x12\n\x06points\x18\x04 \x03(\x11\x42\x02\x10\x01\x12\x18\n\x0cstrokeWidths\x18\x05 \x03(\x11\x42\x02\x10\x01\x12\x17\n\x0bstrokeColor\x18\x06 \x03(\x11\x42\x02\x10\x01\x12\x0f\n\x07unknown\x18\t \x01(\x11\x42\x02H\x03')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'wacompath_pb2', _globals)
+if _descriptor._USE_C_DESCRIPTORS == False:
+  _globals['DESCRIPTOR']._options = None
+  _globals['DESCRIPTOR']._serialized_options = b'H\003'
+  _globals['_PATH'].fields_by_name['points']._options = None
+  _globals['_PATH'].fields_by_name['points']._serialized_options = b'\020\001'
+  _globals['_PATH'].fields_by_name['strokeWidths']._options = None
+  _globals['_PATH'].fields_by_name['strokeWidths']._serialized_options = b'\020\001'
+  _globals['_PATH'].fields_by_name['strokeColor']._options = None
+  _globals['_PATH'].fields_by_name['strokeColor']._serialized_options = b'\020\001'
+  _globals['_PATH']._serialized_start=36
+  _globals['_PATH']._serialized_end=211
+# @@protoc_insertion_point(module_scope)
@@ -9,29 +9,113 @@ __maintainer__ = "Giovanni Iovino"
 __email__ = "giovanni.iovino.dev@gmail.com"
 __status__ = "Development"
 
-from willparser.wacompath import Path
+from willparser.wacompath_pb2 import Path
 import numpy
 import zipfile
-import xmltodict
 import os
 import json
+from xml.etree import ElementTree
+from xml.sax.saxutils import quoteattr
+
+# Buffer size used for output files, large SVG/InkML/JSON documents are written with few write syscalls
+_WRITE_BUFFER_SIZE = 1 << 20
+
+# ElementTree paths used to look up relationships in .rels files, compiled once and cached by ElementTree
+_SECTION_RELATIONSHIP = "{*}Relationship[@Type='http://schemas.willfileformat.org/2015/relationships/section']"
+_PATHS_RELATIONSHIP = "{*}Relationship[@Type='http://schemas.willfileformat.org/2015/relationships/section/paths']"
+
+# Fixed part of the InkML documents written by WillParser.save_as_inkml, traces are written between header and footer
+_INKML_HEADER = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<inkml:ink xmlns:emma="http://www.w3.org/2003/04/emma" xmlns:msink="http://schemas.microsoft.com/ink/2010/main" '
+    'xmlns:inkml="http://www.w3.org/2003/InkML">'
+    '<inkml:definitions>'
+    '<inkml:context xml:id="ctxCoordinatesWithPressure">'
+    '<inkml:inkSource xml:id="inkSrcCoordinatesWithPressure">'
+    '<inkml:traceFormat>'
+    '<inkml:channel name="X" type="integer" max="32767" units="himetric"></inkml:channel>'
+    '<inkml:channel name="Y" type="integer" max="32767" units="himetric"></inkml:channel>'
+    '<inkml:channel name="F" type="integer" max="32767" units="dev"></inkml:channel>'
+    '</inkml:traceFormat>'
+    '<inkml:channelProperties>'
+    '<inkml:channelProperty channel="X" name="resolution" value="1" units="1/himetric"></inkml:channelProperty>'
+    '<inkml:channelProperty channel="Y" name="resolution" value="1" units="1/himetric"></inkml:channelProperty>'
+    '<inkml:channelProperty channel="F" name="resolution" value="1" units="1/dev"></inkml:channelProperty>'
+    '</inkml:channelProperties>'
+    '</inkml:inkSource>'
+    '</inkml:context>'
+    '<inkml:brush xml:id="br0">'
+    '<inkml:brushProperty name="width" value="100" units="himetric"></inkml:brushProperty>'
+    '<inkml:brushProperty name="height" value="100" units="himetric"></inkml:brushProperty>'
+    '<inkml:brushProperty name="color" value="#000000"></inkml:brushProperty>'
+    '<inkml:brushProperty name="transparency" value="0"></inkml:brushProperty>'
+    '<inkml:brushProperty name="tip" value="ellipse"></inkml:brushProperty>'
+    '<inkml:brushProperty name="rasterOp" value="copyPen"></inkml:brushProperty>'
+    '<inkml:brushProperty name="ignorePressure" value="false"></inkml:brushProperty>'
+    '<inkml:brushProperty name="antiAliased" value="true"></inkml:brushProperty>'
+    '<inkml:brushProperty name="fitToCurve" value="false"></inkml:brushProperty>'
+    '</inkml:brush>'
+    '</inkml:definitions>'
+    '<inkml:traceGroup>'
+)
+_INKML_FOOTER = '</inkml:traceGroup></inkml:ink>'
+
+
+def _split_varint_frames(payload):
+    """Splits a buffer of length-prefixed protobuf messages
+    :param payload: bytes holding the messages, each one preceded by its varint encoded length
+    :return: a list of (start, end) offsets of each message in payload
+    """
+    # Bytes with the high bit clear terminate a varint, find all of them in a single vectorized pass
+    _terminators = numpy.flatnonzero((numpy.frombuffer(payload, dtype=numpy.uint8) & 0x80) == 0)
+    _size = len(payload)
+    _frames = []
+    i = 0
+    while i < _size:
+        _k = numpy.searchsorted(_terminators, i)
+        if _k == len(_terminators):
+            break  # truncated length prefix
+        _t = int(_terminators[_k]) + 1
+        _length = 0
+        for _shift, _b in enumerate(payload[i:_t]):
+            _length |= (_b & 0x7F) << (7 * _shift)
+        _frames.append((_t, min(_t + _length, _size)))
+        i = _t + _length
+    return _frames
+
+
+def _to_json(obj):
+    """Converts numpy arrays holding path data to lists when serializing to JSON
+    :param obj: object not natively serializable by json
+    :return: a JSON serializable representation of obj
+    """
+    if isinstance(obj, numpy.ndarray):
+        return obj.tolist()
+    raise TypeError("Object of type %s is not JSON serializable" % type(obj).__name__)
 
 
 class _WillPage:
     """
     Object holding data of each page found in a .will file
+    precision is the highest decimal precision among the page paths, used to round values computed from them
     """
 
-    def __init__(self, paths, width=592, height=864):
+    def __init__(self, paths, width=592, height=864, precision=2):
         self.paths = paths
         self.width = str(width)
         self.height = str(height)
+        self.precision = precision
 
 
 class CurveUtil:
     """Utility class than can be used to generate Catmull-Rom and Bezier curves from an array of points
     """
     alpha = 0.5
+    # Maps the control points of a uniform Catmull-Rom segment to the points of the equivalent cubic Bezier curve
+    c2b_matrix = numpy.array([[0, 1, 0, 0],
+                              [-1 / 6, 1, 1 / 6, 0],
+                              [0, 1 / 6, 1, -1 / 6],
+                              [0, 0, 1, 0]])
 
     def __init__(self):
         pass
@@ -43,101 +127,99 @@ class CurveUtil:
         return (((xj - xi) ** 2 + (yj - yi) ** 2) ** 0.5) ** CurveUtil.alpha + ti
 
     @staticmethod
-    def __catmull_rom_spline(p0, p1, p2, p3, npoints=2):
-        """
-        P0, P1, P2, and P3 should be (x,y) point pairs that define the Catmull-Rom spline.
-        nPoints is the number of points to include in this curve segment.
+    def catmull_rom_chain(points, npoints=2):
+        """Calculate Catmull Rom for a chain of points and return the combined curve.
+        All the segments are evaluated at once, segments that can't be computed (e.g. repeated points) are replaced
+        by their four control points.
         @source: https://en.wikipedia.org/wiki/Centripetal_Catmull%E2%80%93Rom_spline
+        :param points: sequence of (x,y) points
+        :param npoints: number of points to include in each curve segment
+        :return: a (N, 2) array of curve points
         """
-        # Convert the points to numpy so that we can do array multiplication
-        p0, p1, p2, p3 = map(numpy.array, [p0, p1, p2, p3])
+        pts = numpy.asarray(points, dtype=numpy.float64)
+        if len(pts) < 4:
+            return numpy.empty((0, 2))
 
-        # Calculate t0 to t4
+        # Control points of every segment, each one with shape (segments, 1, 2)
+        p0, p1, p2, p3 = (pts[i:len(pts) - 3 + i, numpy.newaxis, :] for i in range(4))
 
+        # Calculate t0 to t3 for every segment, same as get_t
+        d = ((numpy.diff(pts, axis=0) ** 2).sum(axis=1) ** 0.5) ** CurveUtil.alpha
         t0 = 0
-        t1 = CurveUtil.get_t(t0, p0, p1)
-        t2 = CurveUtil.get_t(t1, p1, p2)
-        t3 = CurveUtil.get_t(t2, p2, p3)
-
-        # Only calculate points between P1 and P2
-        t = numpy.linspace(t1, t2, npoints)
-
-        # Reshape so that we can multiply by the points P0 to P3
-        # and get a point for each value of t.
-        t = t.reshape(len(t), 1)
-        a1 = (t1 - t) / (t1 - t0) * p0 + (t - t0) / (t1 - t0) * p1
-        a2 = (t2 - t) / (t2 - t1) * p1 + (t - t1) / (t2 - t1) * p2
-        a3 = (t3 - t) / (t3 - t2) * p2 + (t - t2) / (t3 - t2) * p3
-        b1 = (t2 - t) / (t2 - t0) * a1 + (t - t0) / (t2 - t0) * a2
-        b2 = (t3 - t) / (t3 - t1) * a2 + (t - t1) / (t3 - t1) * a3
-
-        c = (t2 - t) / (t2 - t1) * b1 + (t - t1) / (t2 - t1) * b2
-        if numpy.isnan(c).any():
-            c = [p0, p1, p2, p3]
-        return c
+        t1 = d[:-2]
+        t2 = t1 + d[1:-1]
+        t3 = t2 + d[2:]
 
-    @staticmethod
-    def catmull_rom_chain(points):
-        """Calculate Catmull Rom for a chain of points and return the combined curve.
-        @source: https://en.wikipedia.org/wiki/Centripetal_Catmull%E2%80%93Rom_spline
-        """
-        sz = len(points)
+        # Only calculate points between P1 and P2, t has shape (segments, npoints, 1)
+        t = numpy.linspace(t1, t2, npoints, axis=1)[:, :, numpy.newaxis]
+        t1, t2, t3 = (v[:, numpy.newaxis, numpy.newaxis] for v in (t1, t2, t3))
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            a1 = (t1 - t) / (t1 - t0) * p0 + (t - t0) / (t1 - t0) * p1
+            a2 = (t2 - t) / (t2 - t1) * p1 + (t - t1) / (t2 - t1) * p2
+            a3 = (t3 - t) / (t3 - t2) * p2 + (t - t2) / (t3 - t2) * p3
+            b1 = (t2 - t) / (t2 - t0) * a1 + (t - t0) / (t2 - t0) * a2
+            b2 = (t3 - t) / (t3 - t1) * a2 + (t - t1) / (t3 - t1) * a3
 
-        # The curve C will contain an array of (x,y) points.
-        c = []
-        for i in range(sz - 3):
-            _p = CurveUtil.__catmull_rom_spline(points[i], points[i + 1], points[i + 2], points[i + 3])
-            c.extend(_p)
+            c = (t2 - t) / (t2 - t1) * b1 + (t - t1) / (t2 - t1) * b2
 
-        return c
+        _invalid = numpy.isnan(c).any(axis=(1, 2))
+        if not _invalid.any():
+            return c.reshape(-1, 2)
+        _control = numpy.concatenate((p0, p1, p2, p3), axis=1)
+        return numpy.concatenate([_control[i] if _invalid[i] else c[i] for i in range(len(c))])
 
     @staticmethod
-    def __bezier(p0, p1, p2, p3):
-        """Convert a Catmull-Rom segment to a Bezier curve
-        :param p0: point [x,y]
-        :param p1: point [x,y]
-        :param p2: point [x,y]
-        :param p3: point [x,y]
-        :return: Array of Bezier points
+    def bezier_chain(points):
+        """Calculate Bezier for a chain of points and return the combined curve.
+        Each Catmull-Rom segment is converted to a cubic Bezier curve, all the segments are computed at once.
+        :param points: sequence of (x,y) points
+        :return: a (N, 4, 2) array with the four Bezier points of each segment
         """
-        p0, p1, p2, p3 = map(numpy.array, [p0, p1, p2, p3])
+        pts = numpy.asarray(points, dtype=numpy.float64)
+        if len(pts) < 4:
+            return numpy.empty((0, 4, 2))
 
+        # Control points of every segment, each one with shape (segments, 2)
+        p0, p1, p2, p3 = (pts[i:len(pts) - 3 + i] for i in range(4))
+
+        # Calculate t0 to t3 for every segment, same as get_t
+        d = ((numpy.diff(pts, axis=0) ** 2).sum(axis=1) ** 0.5) ** CurveUtil.alpha
         t0 = 0.0
-        t1 = CurveUtil.get_t(t0, p0, p1)
-        t2 = CurveUtil.get_t(t1, p1, p2)
-        t3 = CurveUtil.get_t(t2, p2, p3)
-
-        c1 = (t2 - t1) / (t2 - t0)
-        c2 = (t1 - t0) / (t2 - t0)
-        d1 = (t3 - t2) / (t3 - t1)
-        d2 = (t2 - t1) / (t3 - t1)
-        m1 = (t2 - t1) * (c1 * (p1 - p0) / (t1 - t0) + c2 * (p2 - p1) / (t2 - t1))
-        m2 = (t2 - t1) * (d1 * (p2 - p1) / (t2 - t1) + d2 * (p3 - p2) / (t3 - t2))
-        q0 = p1
-        q1 = (p1 + m1 / 3)
-        q2 = (p2 - m2 / 3)
-        if numpy.isnan(q1).any():
-            q1 = p1
-        if numpy.isnan(q2).any():
-            q1 = p2
-        q3 = p2
-        bp = [q0, q1, q2, q3]
-
-        return bp
+        t1 = d[:-2]
+        t2 = t1 + d[1:-1]
+        t3 = t2 + d[2:]
+        t1, t2, t3 = (v[:, numpy.newaxis] for v in (t1, t2, t3))
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            c1 = (t2 - t1) / (t2 - t0)
+            c2 = (t1 - t0) / (t2 - t0)
+            d1 = (t3 - t2) / (t3 - t1)
+            d2 = (t2 - t1) / (t3 - t1)
+            m1 = (t2 - t1) * (c1 * (p1 - p0) / (t1 - t0) + c2 * (p2 - p1) / (t2 - t1))
+            m2 = (t2 - t1) * (d1 * (p2 - p1) / (t2 - t1) + d2 * (p3 - p2) / (t3 - t2))
+        q1 = p1 + m1 / 3
+        q2 = p2 - m2 / 3
+        # Degenerate segments (e.g. repeated points) fall back to the segment end points as handles
+        q1 = numpy.where(numpy.isnan(q1).any(axis=1, keepdims=True), p1, q1)
+        q2 = numpy.where(numpy.isnan(q2).any(axis=1, keepdims=True), p2, q2)
+
+        return numpy.stack((p1, q1, q2, p2), axis=1)
 
     @staticmethod
-    def bezier_chain(points):
-        """Calculate Bezier for a chain of points and return the combined curve.
-        :param points:
-        :return:
+    def uniform_bezier_chain(points):
+        """Calculate Bezier for a chain of points using the uniform Catmull-Rom parameterization.
+        Faster than bezier_chain, all the segments are converted with a single matrix product.
+        :param points: sequence of (x,y) points
+        :return: a (N, 4, 2) array with the four Bezier points of each segment
         """
+        pts = numpy.asarray(points, dtype=numpy.float64)
+        if len(pts) < 4:
+            return numpy.empty((0, 4, 2))
 
-        chain = []
-        for i in range(len(points) - 3):
-            c = CurveUtil.__bezier(points[i], points[i + 1], points[i + 2], points[i + 3])
-            chain.append(c)
-
-        return numpy.array(chain)
+        # Control points of every segment, shape (segments, 4, 2)
+        p = numpy.stack([pts[i:len(pts) - 3 + i] for i in range(4)], axis=1)
+        return numpy.einsum('ij,njd->nid', CurveUtil.c2b_matrix, p)
 
 
 class WillParser:
@@ -155,36 +237,29 @@ class WillParser:
         """
         self.pages = []
         self.filename = fname
-        _will = zipfile.ZipFile(fname)
+        with zipfile.ZipFile(fname) as _will:
+            # Reads all the members needed to build the pages in a single pass over the archive
+            _members = {_name: _will.read(_name) for _name in _will.namelist()
+                        if _name == '_rels/.rels' or _name.startswith('sections/')}
 
         # Reads .rels file to collect saved pages
-        _f = _will.open('_rels/.rels', 'r')
-        _rels_content = _f.read()
-        _f.close()
-        _rels = xmltodict.parse(_rels_content)
-        for _r in _rels['Relationships']['Relationship']:
-
-            if _r['@Type'] == 'http://schemas.willfileformat.org/2015/relationships/section':
-                _svg = os.path.split(_r['@Target'])[1]
-                _s_rel_path = 'sections/_rels/' + _svg + '.rels'
-                _s_rel_f = _will.open(_s_rel_path)
-                _s_rel_content = _s_rel_f.read()
-                _s_rel_f.close()
-                _s_rel = xmltodict.parse(_s_rel_content)
-                _proto_file = 'sections/media/' + os.path.split(_s_rel['Relationships']['Relationship']['@Target'])[1]
-                # Reads page properties from svg section file
-                _f = _will.open('sections/' + _svg)
-                _svg_content = _f.read()
-                _f.close()
-                _svg_data = xmltodict.parse(_svg_content)
-                _width = _svg_data.get('svg', {}).get('@width', 592)
-                _height = _svg_data.get('svg', {}).get('@height', 864)
-                # Reads data from protobuf file associated to the svg section file
-                _f = _will.open(_proto_file)
-                _content = _f.read()
-                _f.close()
-                _paths = self.__read_will_paths(_content)
-                self.pages.append(_WillPage(_paths, _width, _height))
+        _rels_content = _members['_rels/.rels']
+        _rels = ElementTree.fromstring(_rels_content)
+        for _r in _rels.iterfind(_SECTION_RELATIONSHIP):
+            _svg = os.path.split(_r.get('Target'))[1]
+            _s_rel_path = 'sections/_rels/' + _svg + '.rels'
+            _s_rel_content = _members[_s_rel_path]
+            _s_rel = ElementTree.fromstring(_s_rel_content)
+            _proto_file = 'sections/media/' + os.path.split(_s_rel.find(_PATHS_RELATIONSHIP).get('Target'))[1]
+            # Reads page properties from svg section file
+            _svg_content = _members['sections/' + _svg]
+            _svg_data = ElementTree.fromstring(_svg_content)
+            _width = _svg_data.get('width', 592)
+            _height = _svg_data.get('height', 864)
+            # Reads data from protobuf file associated to the svg section file
+            _content = _members[_proto_file]
+            _paths, _precision = self.__read_will_paths(_content)
+            self.pages.append(_WillPage(_paths, _width, _height, _precision))
 
     def save_as_json(self, fname=None):
         """Save the parsed .will file in a JSON file
@@ -205,58 +280,24 @@ class WillParser:
             }
             _pages.append(_j_page)
 
-        _f = open(_fname + ".json", "w")
-        _f.write(json.dumps(_pages, indent=4))
-        _f.close()
+        # Stream the document to the file instead of building the whole JSON string in memory
+        with open(_fname + ".json", "w", buffering=_WRITE_BUFFER_SIZE) as _f:
+            json.dump(_pages, _f, indent=4, default=_to_json)
 
-    def save_as_svg(self, fname=None, use_polyline=False):
+    def save_as_svg(self, fname=None, use_polyline=False, use_curves=False):
         """Save the parsed .will file in a SVG file
         Each section of the input file will be saved on a separated SVG file.
         :param fname: Output file name
         :param use_polyline: Set to true if you want to use svg polylines instead of svg paths during conversion
+        :param use_curves: Set to true if you want svg paths made of cubic Bezier curves instead of lines.
+        Ignored when use_polyline is set
         """
         _fname = self.filename
         if fname is not None:
             _fname = os.path.splitext(fname)[0]
-        __page_n = 0
-        for page in self.pages:
-            p_dict = {
-                "svg": {
-                    "@width": str(page.width),
-                    "@height": str(page.height),
-                    "polyline": [],
-                    "path": []
-                }
-            }
 
-            for path in page.paths:
-                pth_dict = {
-                    "@style": 'fill:none;stroke:black;stroke-width:' + str(path['avg_width'])
-                }
-
-                if use_polyline:
-                    _data = ""
-                    for p in path['points']:
-                        _data += str(p[0]) + "," + str(p[1]) + " "
-                    pth_dict['@points'] = _data
-                    p_dict['svg']['polyline'].append(pth_dict)
-                else:
-
-                    _data = ""
-                    _first = True
-                    for p in path['points']:
-                        if _first:
-                            _data += "M" + str(p[0]) + " " + str(p[1])
-                            _first = False
-                        else:
-                            _data += " L" + str(p[0]) + " " + str(p[1])
-                    pth_dict['@d'] = _data
-                    p_dict['svg']['path'].append(pth_dict)
-
-            _f = open(_fname + str(__page_n) + ".svg", "w")
-            _f.write(xmltodict.unparse(p_dict, pretty=True))
-            _f.close()
-            __page_n += 1
+        for _page_n, _page in enumerate(self.pages):
+            self.__save_svg_page(_fname + str(_page_n) + ".svg", _page, use_polyline, use_curves)
 
     def save_as_inkml(self, fname=None):
         """Save the parsed .will file in a InkML file
@@ -268,176 +309,101 @@ class WillParser:
         if fname is not None:
             _fname = os.path.splitext(fname)[0]
 
-        _p_dict = {
-            'inkml:ink': {
-                '@xmlns:emma': 'http://www.w3.org/2003/04/emma',
-                '@xmlns:msink': 'http://schemas.microsoft.com/ink/2010/main',
-                '@xmlns:inkml': 'http://www.w3.org/2003/InkML',
-                'inkml:definitions': {
-                    'inkml:context': {
-                        '@xml:id': 'ctxCoordinatesWithPressure',
-                        'inkml:inkSource': {
-                            '@xml:id': 'inkSrcCoordinatesWithPressure',
-                            'inkml:traceFormat': {
-                                'inkml:channel': [
-                                    {
-                                        '@name': 'X',
-                                        '@type': 'integer',
-                                        '@max': 32767,
-                                        '@units': 'himetric'
-                                    },
-                                    {
-                                        '@name': 'Y',
-                                        '@type': 'integer',
-                                        '@max': 32767,
-                                        '@units': 'himetric'
-                                    },
-                                    {
-                                        '@name': 'F',
-                                        '@type': 'integer',
-                                        '@max': 32767,
-                                        '@units': 'dev'
-                                    }
-                                ]
-                            },
-                            'inkml:channelProperties': {
-                                'inkml:channelProperty': [
-                                    {
-                                        '@channel': 'X',
-                                        '@name': 'resolution',
-                                        '@value': 1,
-                                        '@units': '1/himetric'
-                                    },
-                                    {
-                                        '@channel': 'Y',
-                                        '@name': 'resolution',
-                                        '@value': 1,
-                                        '@units': '1/himetric'
-                                    },
-                                    {
-                                        '@channel': 'F',
-                                        '@name': 'resolution',
-                                        '@value': 1,
-                                        '@units': '1/dev'
-                                    }
-                                ]
-                            }
-                        }
-                    },
-                    'inkml:brush': {
-                        '@xml:id': 'br0',
-                        'inkml:brushProperty': [
-                            {
-                                '@name': 'width',
-                                '@value': 100,
-                                '@units': 'himetric'
-                            },
-                            {
-                                '@name': 'height',
-                                '@value': 100,
-                                '@units': 'himetric'
-                            },
-                            {
-                                '@name': 'color',
-                                '@value': '#000000'
-                            },
-                            {
-                                '@name': 'transparency',
-                                '@value': 0
-                            },
-                            {
-                                '@name': 'tip',
-                                '@value': 'ellipse'
-                            },
-                            {
-                                '@name': 'rasterOp',
-                                '@value': 'copyPen'
-                            },
-                            {
-                                '@name': 'ignorePressure',
-                                '@value': False
-                            },
-                            {
-                                '@name': 'antiAliased',
-                                '@value': True
-                            },
-                            {
-                                '@name': 'fitToCurve',
-                                '@value': False
-                            }
-                        ]
-                    }
-                },
-                'inkml:traceGroup': {
-                    'inkml:trace': []
-                }
-            }
-        }
-        __page_n = 0
-        for page in self.pages:
-            __i = 0
-            for path in page.paths:
-                _t_dict = {
-                    '@xml:id': 'trace_' + str(__i),
-                    '@contextRef': '#ctxCoordinatesWithPressure',
-                    '@brushRef': '#br0'
-                }
+        for _page_n, _page in enumerate(self.pages):
+            self.__save_inkml_page(_fname + str(_page_n) + ".inkml", _page)
+
+    @staticmethod
+    def __save_svg_page(fname, page, use_polyline, use_curves):
+        """
+        Save a single page in a SVG file, see save_as_svg
+        :param fname: Output file name
+        :param page: the _WillPage to save
+        :param use_polyline: Set to true to use svg polylines instead of svg paths
+        :param use_curves: Set to true to use cubic Bezier curves in svg paths
+        """
+        if use_polyline:
+            _tag, _attr = 'polyline', 'points'
+        else:
+            _tag, _attr = 'path', 'd'
+
+        _elements = []
+        for path in page.paths:
+            _pts = path['points']
+            # Coordinates are converted to Python floats and formatted in bulk, then paired as x, y
+            _coords = list(map(str, _pts.ravel().tolist()))
+            _xs, _ys = _coords[0::2], _coords[1::2]
+            if use_polyline:
+                _data = "".join([f"{x},{y} " for x, y in zip(_xs, _ys)])
+            elif use_curves and len(_xs) > 1:
+                # End points are repeated so that the curve goes through the whole stroke
+                _bezier = CurveUtil.uniform_bezier_chain(numpy.concatenate((_pts[:1], _pts, _pts[-1:])))
+                # Bezier points are rounded to the precision of the stroke data, as the line output is
+                numpy.round(_bezier, page.precision, out=_bezier)
+                _data = "M" + _xs[0] + " " + _ys[0] + "".join(
+                    " C%s %s %s %s %s %s" % tuple(c) for c in _bezier[:, 1:, :].reshape(-1, 6).tolist())
+            elif _xs:
+                _data = "M" + " L".join([f"{x} {y}" for x, y in zip(_xs, _ys)])
+            else:
                 _data = ""
-                __j = 0
-                __l = len(path['points']) - 1
-                for p in path['points']:
-                    _data += str(int(p[0] * 26.45833)) + " " + str(int(p[1] * 26.45833)) + " " + str(path['avg_width']*1000)
-                    if __j < __l:
-                        _data += ","
-                    __j += 1
-                _t_dict['#text'] = _data
-                _p_dict['inkml:ink']['inkml:traceGroup']['inkml:trace'].append(_t_dict)
-                __i += 1
-
-            _f = open(_fname + str(__page_n) + ".inkml", "w")
-            _f.write(xmltodict.unparse(_p_dict))
-            _f.close()
-            __page_n += 1
+            _elements.append('\n\t<%s style="fill:none;stroke:black;stroke-width:%s" %s="%s"></%s>'
+                             % (_tag, path['avg_width'], _attr, _data, _tag))
+        if _elements:
+            _elements.append('\n')
 
-    def __read_will_paths(self, payload):
+        with open(fname, "w", buffering=_WRITE_BUFFER_SIZE) as _f:
+            _f.write('<?xml version="1.0" encoding="utf-8"?>\n<svg width=%s height=%s>'
+                     % (quoteattr(str(page.width)), quoteattr(str(page.height))))
+            _f.write("".join(_elements))
+            _f.write('</svg>')
+
+    @staticmethod
+    def __save_inkml_page(fname, page):
         """
-        Used to read  paths object from a will file protobuf section. Protobuf3 for python doesn't seems to handle correctly
-        packed values, so this method provides an internal implementation for decoding a bytes payload
-        :param payload: the protobuf content to parse
-        :return: a list of Path objects
+        Save a single page in a InkML file, see save_as_inkml
+        :param fname: Output file name
+        :param page: the _WillPage to save
         """
-        _l = 0
-        __l = 0
-        _paths = []
+        _traces = []
         __i = 0
-        for b in payload:
-            if _l == 0:
-                if (b & 0x80) == 0x80:
-                    __l += (b & 0x7F) << (7 * __i)
-                    __i += 1
-                else:
-                    __l += (b & 0x7F) << (7 * __i)
-                    _paths.append([])  # new path
-                    _l = __l
-            else:
-                __i = 0
-                __l = 0
-                _paths[len(_paths) - 1].append(b)
-                _l -= 1
+        for path in page.paths:
+            # Coordinates are converted to himetric, the average width is used as force for every point
+            _coords = (path['points'] * 26.45833).astype(numpy.int64)
+            _coords = list(map(str, _coords.ravel().tolist()))
+            _w = str(path['avg_width'] * 1000)
+            _data = ",".join([f"{x} {y} {_w}" for x, y in zip(_coords[0::2], _coords[1::2])])
+            _traces.append(f'<inkml:trace xml:id="trace_{__i}" contextRef="#ctxCoordinatesWithPressure" '
+                           f'brushRef="#br0">{_data}</inkml:trace>')
+            __i += 1
+
+        with open(fname, "w", buffering=_WRITE_BUFFER_SIZE) as _f:
+            _f.write(_INKML_HEADER)
+            _f.write("".join(_traces))
+            _f.write(_INKML_FOOTER)
 
+    def __read_will_paths(self, payload):
+        """
+        Used to read  paths object from a will file protobuf section. The section is a sequence of length-prefixed
+        Path messages, each one is parsed by the protobuf runtime
+        :param payload: the protobuf content to parse
+        :return: a list of Path objects and the highest decimal precision among them
+        """
         # Parse binary paths
         ret_paths = []
-        for _pth in _paths:
-            p = Path()
-            p.parse_from_bytes(_pth)
-
-            ints = self.__read_packed_sint32(p.points)
-            points = self.__decode_will_coordinates(ints, p.decimalPrecision)
-
-            strokes = self.__read_packed_sint32(p.strokeWidths)
-            strokes = self.__decode_delta_encoded(strokes, p.decimalPrecision)
-            _w = numpy.average(numpy.array(strokes))
-            color = self.__read_packed_sint32(p.strokeColor)
+        _precision = 0
+        # A single message is reused for every path, ParseFromString clears the previously parsed fields
+        p = Path()
+        # Messages are parsed from zero-copy views of the payload
+        _view = memoryview(payload)
+        for _s, _e in _split_varint_frames(payload):
+            p.ParseFromString(_view[_s:_e])
+
+            _precision = max(_precision, p.decimalPrecision)
+            _p = pow(10, p.decimalPrecision)
+            points = self.__decode_will_coordinates(p.points, _p)
+
+            strokes = self.__decode_delta_encoded(p.strokeWidths, _p)
+            _w = numpy.average(strokes)
+            color = list(p.strokeColor)
 
             _path_dict = {
                 "points": points,
@@ -447,65 +413,35 @@ class WillParser:
             }
             ret_paths.append(_path_dict)
 
-        return ret_paths
+        return ret_paths, _precision
 
-    def __read_packed_sint32(self, payload):
-        """
-        Converts a bytes payload containing sint32 values and compliant to protobuf2 to a list of signed int values.
-        Protobuf3 for python doesn't seems to handle correctly
-        packed values, so this method provides an internal implementation for decoding a bytes payload
-        :param payload: the protobuf content to parse
-        :return:
-        """
-        _ints = []
-        __l = 0
-        __i = 0
-        for _b in payload:
-            if (_b & 0x80) == 0x80:
-                __l += (_b & 0x7F) << (7 * __i)
-                __i += 1
-            else:
-                __l += (_b & 0x7F) << (7 * __i)
-                _n = (__l >> 1) ^ -(__l & 1)  # protobuf sint32 zigzag decode
-                _ints.append(_n)
-                __l = 0
-                __i = 0
-        return _ints
-
-    def __decode_will_coordinates(self, _ints, _precision):
+    def __decode_will_coordinates(self, _ints, _p):
         """
         Used to decode coordinates from .will data-format as defined in
         https://developer-docs.wacom.com/display/DevDocs/WILL+Data+Format
-        :param _ints: list of integer values
-        :param _precision: decimal position for conversion to float
-        :return: a list of converted float values
+        :param _ints: sequence of integer values
+        :param _p: conversion factor to float, 10 ** decimal precision of the path
+        :return: a (N, 2) array of converted float values
         """
         _l = int(len(_ints) / 2)
-        _p = pow(10, _precision)
-        _points = [[_ints[0], _ints[1]]]
-        _i = 2
-        for i in range(2, _l):
-            _points.append([(_points[i - 2][0] + _ints[_i]), (_points[i - 2][1] + _ints[_i + 1])])
-            _i += 2
-        for i in range(0, len(_points)):
-            _points[i][0] = _points[i][0] / _p
-            _points[i][1] = _points[i][1] / _p
+        # Coordinates are stored as (x, y) deltas, a cumulative sum restores the absolute positions.
+        # Accumulation and scaling run in place on a single float buffer, integer sums are exact in float64
+        _points = numpy.fromiter(_ints, dtype=numpy.float64, count=_l * 2).reshape(-1, 2)
+        numpy.cumsum(_points, axis=0, out=_points)
+        _points /= _p
 
         return _points
 
-    def __decode_delta_encoded(self, _ints, _precision):
+    def __decode_delta_encoded(self, _ints, _p):
         """
         Used handle delta encoding as defined in
         https://developer-docs.wacom.com/display/DevDocs/WILL+Data+Format
-        :param _ints: list of integer values
-        :param _precision: decimal position for conversion to float
-        :return: a list of converted float values
+        :param _ints: sequence of integer values
+        :param _p: conversion factor to float, 10 ** decimal precision of the path
+        :return: an array of converted float values
         """
-        _p = pow(10, _precision)
-
-        for i in range(1, len(_ints)):
-            _ints[i] = _ints[i - 1] + _ints[i]
-        for i in range(0, len(_ints)):
-            _ints[i] = _ints[i] / _p
+        _values = numpy.fromiter(_ints, dtype=numpy.float64, count=len(_ints))
+        numpy.cumsum(_values, out=_values)
+        _values /= _p
 
-        return _ints
+        return _values